@@ -1,9 +1,25 @@
-import itertools
-import string
+import re
 import sys
+import threading
+
+_SYNC_PORT_RE = re.compile(r':(\d+)$')
+
+_NO_CWD_WARN = """
+        =======================================================================
+        WARN - no working directory defined for controller with command line 
+        %s
+        The controller is run in the STS base directory. This may result
+        in unintended consequences (i.e., POX not logging correctly).
+        =======================================================================
+        \n"""
 
 class ControllerConfig(object):
-  _port_gen = itertools.count(8888)
+  __slots__ = ('cmdline', 'address', 'port', 'name', 'cwd', 'sync',
+               'sync_port', '_expanded')
+  _next_port = 8888
+  _port_lock = threading.Lock()
+  # Only warn about a missing cwd once per command line
+  _warned_cmdlines = set()
 
   def __init__(self, cmdline="", address="127.0.0.1", port=None, cwd=None, sync=None, controller_type=None):
     '''
@@ -23,9 +39,16 @@ class ControllerConfig(object):
     self.cmdline = cmdline
     self.address = address
     if not port:
-      port = self._port_gen.next()
+      with ControllerConfig._port_lock:
+        port = ControllerConfig._next_port
+        ControllerConfig._next_port += 1
 
     self.port = port
+    # cmdline, address, and port don't change after construction, so
+    # interpolate them once rather than on every controller (re)start
+    self._expanded = [ token.replace("__address__", str(address))
+                            .replace("__port__", str(port))
+                       for token in cmdline.split() ]
 
     # TODO(sam): we should either call them all controller_type or all 'name'
     # we only accept strings
@@ -38,17 +61,17 @@ class ControllerConfig(object):
       self.name = "floodlight"
 
     self.cwd = cwd
-    if not cwd:
-        sys.stderr.write("""
-        =======================================================================
-        WARN - no working directory defined for controller with command line 
-        %s
-        The controller is run in the STS base directory. This may result
-        in unintended consequences (i.e., POX not logging correctly).
-        =======================================================================
-        \n""" % (self.cmdline) )
+    if not cwd and self.cmdline not in ControllerConfig._warned_cmdlines:
+      sys.stderr.write(_NO_CWD_WARN % (self.cmdline))
+      ControllerConfig._warned_cmdlines.add(self.cmdline)
 
     self.sync = sync
+    # The port the controller's sync module should listen on
+    self.sync_port = None
+    if sync:
+      port_match = _SYNC_PORT_RE.search(sync)
+      if port_match is not None:
+        self.sync_port = int(port_match.group(1))
 
   @property
   def uuid(self):
@@ -56,9 +79,7 @@ class ControllerConfig(object):
 
   @property
   def expanded_cmdline(self):
-    return map(lambda(x): string.replace(x, "__port__", str(self.port)),
-           map(lambda(x): string.replace(x, "__address__", str(self.address)),
-             self.cmdline.split()))
+    return self._expanded
 
   def __repr__(self):
     attributes = ("cmdline", "address", "port", "cwd", "sync")
@@ -16,13 +16,14 @@ class DumbEventScheduler(object):
     if self.last_event:
       rec_delta = (event.time.as_float() - self.last_event.time.as_float())
       if rec_delta > 0:
-        log.info("Sleeping for %.0f ms before next event" % (rec_delta * 1000))
+        log.info("Sleeping for %.0f ms before next event", rec_delta * 1000)
         self.simulation.io_master.sleep(rec_delta)
 
     start = time.time()
+    end = start + self.epsilon_seconds
 
-    log.debug("Waiting for %r (maximum wait time: %.0f ms)" %
-          ( event, self.epsilon_seconds * 1000) )
+    log.debug("Waiting for %r (maximum wait time: %.0f ms)",
+              event, self.epsilon_seconds * 1000)
 
     proceed = False
     while True:
@@ -32,15 +33,18 @@ class DumbEventScheduler(object):
         break
       elif now > end:
         break
-      self.simulation.io_master.select(self.sleep_interval_seconds)
+      # select() returns as soon as there is I/O to handle; never block past
+      # the deadline
+      self.simulation.io_master.select(min(self.sleep_interval_seconds,
+                                           end - now))
     if proceed:
-      log.debug("Succcessfully executed %r" % event)
+      log.debug("Succcessfully executed %r", event)
     else:
-      log.warn("Timed out waiting for Event %r" % event)
+      log.warn("Timed out waiting for Event %r", event)
     self.last_event = event
 
 class EventScheduler(object):
-  '''an EventWatchers schedules events. It controls their admission, and
+  '''an EventScheduler schedules events. It controls their admission, and
   any post-event delay '''
 
   kwargs = set(['speedup', 'delay_input_events', 'initial_wait',
@@ -59,7 +63,7 @@ class EventScheduler(object):
     self.sleep_interval_seconds = sleep_interval_seconds
 
   def schedule(self, event):
-    if isinstance(event, InputEvent):
+    if event._event_flags & INPUT_EVENT_FLAG:
       self.inject_input(event)
     else:
       self.wait_for_internal(event)
@@ -69,8 +73,8 @@ class EventScheduler(object):
     if self.delay_input_events:
       wait_time_seconds = self.wait_time(event)
       if wait_time_seconds > 0.01:
-        log.debug("Delaying input_event %r for %.0f ms" %
-            ( event , (wait_time_seconds) * 1000 ))
+        log.debug("Delaying input_event %r for %.0f ms",
+                  event, wait_time_seconds * 1000)
 
         self.simulation.io_master.sleep(wait_time_seconds)
     log.debug("Injecting %r", event)
@@ -85,8 +89,8 @@ class EventScheduler(object):
     # TODO(cs): why - 0.01?
     end = start + wait_time_seconds - 0.01 + self.epsilon_seconds
 
-    log.debug("Waiting for %r (maximum wait time: %.0f ms)" %
-          ( event, wait_time_seconds * 1000) )
+    log.debug("Waiting for %r (maximum wait time: %.0f ms)",
+              event, wait_time_seconds * 1000)
     self._poll_event(event, end)
 
   def _poll_event(self, event, end_time):
@@ -98,12 +102,15 @@ class EventScheduler(object):
         break
       elif now > end_time:
         break
-      self.simulation.io_master.select(self.sleep_interval_seconds)
+      # select() returns as soon as there is I/O to handle; never block past
+      # the deadline
+      self.simulation.io_master.select(min(self.sleep_interval_seconds,
+                                           end_time - now))
     if proceed:
-      log.debug("Succcessfully executed %r" % event)
+      log.debug("Succcessfully executed %r", event)
       self.update_event_time(event)
     else:
-      log.warn("Timed out waiting for Event %r" % event)
+      log.warn("Timed out waiting for Event %r", event)
 
   def update_event_time(self, event):
     """ update events """
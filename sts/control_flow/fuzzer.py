@@ -10,6 +10,7 @@ from sts.topology import BufferedPatchPanel
 from sts.traffic_generator import TrafficGenerator
 from sts.util.console import msg
 from sts.replay_event import *
+from sts.invariant_checker import InvariantChecker
 from pox.lib.util import TimeoutError
 
 from sts.control_flow.base import ControlFlow, RecordingSyncCallback
@@ -7,6 +7,7 @@ control flow type for running the simulation forward.
 from sts.topology import BufferedPatchPanel
 from sts.util.console import msg
 from sts.replay_event import *
+from sts.invariant_checker import InvariantChecker
 
 from sts.control_flow.base import ControlFlow, RecordingSyncCallback
 
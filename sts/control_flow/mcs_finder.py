@@ -6,6 +6,7 @@ find the minimal causal set (MCS) of a failure.
 from sts.util.console import msg
 from sts.util.convenience import timestamp_string
 from sts.replay_event import *
+from sts.invariant_checker import InvariantChecker
 from sts.event_dag import EventDag, split_list
 import sts.log_processing.superlog_parser as superlog_parser
 from sts.input_traces.input_logger import InputLogger
@@ -3,7 +3,8 @@ import time
 
 from sts.event_dag import EventDag
 from sts.control_flow.replayer import Replayer
-from sts.replay_event import Event, InternalEvent, InputEvent, WaitTime
+from sts.replay_event import Event, InternalEvent, InputEvent, WaitTime, \
+                             INTERNAL_EVENT_FLAG
 
 log = logging.getLogger("sts")
 
@@ -33,20 +34,24 @@ class Peeker(object):
       return dag
 
     # Initilize current_input_prefix to the longest_match prefix we've
-    # inferred previously (or [] if this is an entirely new prefix)
-    current_input_prefix = list(self._prefix_trie\
-                                .longest_prefix(input_events, default=[]))
-    log.debug("Current input prefix: %s" % str(current_input_prefix))
-
+    # inferred previously (or [] if this is an entirely new prefix).
     # The value is both internal events and input events (values of the trie)
     # leading up, but not including the next input following the tail of the
     # prefix.
     # Note that we assume that there are no internal events before the first
     # input event (i.e. we assume quiescence)
-    inferred_events = list(self._prefix_trie\
-                           .longest_prefix_value(input_events, default=[]))
-    log.debug("Current inferred_events: %s" % str(inferred_events))
+    # Fetch both from a single walk of the trie
+    (current_input_prefix,
+     inferred_events) = self._prefix_trie.longest_prefix_item(input_events,
+                                                              default=([], []))
+    current_input_prefix = list(current_input_prefix)
+    inferred_events = list(inferred_events)
+    log.debug("Current input prefix: %s", current_input_prefix)
+    log.debug("Current inferred_events: %s", inferred_events)
     inject_input_idx = len(current_input_prefix)
+    # Map each event to its position once, rather than searching
+    # dag.events twice for every input we inject
+    event2index = dict((e, i) for i, e in enumerate(dag.events))
 
     # While we still have inputs to inject
     while inject_input_idx < len(input_events):
@@ -60,11 +65,11 @@ class Peeker(object):
         following_input = None
 
       # The input following the one we're going to inject
-      log.debug("peek()'ing after input %d" %
-                (inject_input_idx))
+      log.debug("peek()'ing after input %d", inject_input_idx)
 
       expected_internal_events = \
-        get_expected_internal_events(inject_input, following_input, dag.events)
+        get_expected_internal_events(inject_input, following_input, dag.events,
+                                     event2index=event2index)
 
       # Optimization: if no internal events occured between this input and the
       # next, no need to peek()
@@ -112,7 +117,7 @@ class Peeker(object):
     simulation.set_pass_through()
 
     # Note that this is the monkey patched version of time.sleep
-    log.debug("peek()'ing for %f seconds" % wait_time_seconds)
+    log.debug("peek()'ing for %f seconds", wait_time_seconds)
     time.sleep(wait_time_seconds)
 
     # Now turn off those pass-through and grab the inferred events
@@ -122,15 +127,15 @@ class Peeker(object):
 
   def match_and_filter(self, newly_inferred_events, expected_internal_events):
     log.debug("Matching fingerprints")
-    log.debug("Expected: %s" % str(expected_internal_events))
-    log.debug("Inferred: %s" % str(newly_inferred_events))
+    log.debug("Expected: %s", expected_internal_events)
+    log.debug("Inferred: %s", newly_inferred_events)
     # TODO(cs): currently not calling this, out of paranoia. May inadvertently
     # prune expected internal events -- largely serves as an optimization
     #newly_inferred_events = match_fingerprints(newly_inferred_events,
     #                                           expected_internal_events)
     newly_inferred_events = correct_timestamps(newly_inferred_events,
                                                expected_internal_events)
-    log.debug("Matched events: %s" % str(newly_inferred_events))
+    log.debug("Matched events: %s", newly_inferred_events)
     return newly_inferred_events
 
   def _update_trie(self, current_input_prefix, inject_input, inferred_events,
@@ -145,26 +150,34 @@ class Peeker(object):
     self._prefix_trie[current_input_prefix] = inferred_events
     return (current_input_prefix, inferred_events)
 
-def get_expected_internal_events(left_input, right_input, events_list):
+def get_expected_internal_events(left_input, right_input, events_list,
+                                 event2index=None):
   ''' Return previously observed internal events between the left_input and
   the right_input event
 
   left_input may be None case we return events from the beginning of events_list
 
   right_input may also be None, in which case we return all events following left_input
+
+  event2index, if given, maps each event in events_list to its index
   '''
+  if event2index is None:
+    index = events_list.index
+  else:
+    index = event2index.__getitem__
+
   if left_input is None:
     left_idx = 0
   else:
-    left_idx = events_list.index(left_input)
+    left_idx = index(left_input)
 
   if right_input is None:
     right_idx = len(events_list)
   else:
-    right_idx = events_list.index(right_input)
+    right_idx = index(right_input)
 
   return [ i for i in events_list[left_idx:right_idx]
-             if isinstance(i, InternalEvent) ]
+             if i._event_flags & INTERNAL_EVENT_FLAG ]
 
 # Truncate the newly inferred events based on the expected
 # predecessors of next_input+1
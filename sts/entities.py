@@ -12,21 +12,32 @@ from sts.util.console import msg
 
 import logging
 import os
-import re
-import pickle
+import threading
+import weakref
+try:
+  import cPickle as pickle
+except ImportError:
+  import pickle
 
 class DeferredOFConnection(OFConnection):
   def __init__(self, io_worker, dpid, god_scheduler):
     super(DeferredOFConnection, self).__init__(io_worker)
     self.dpid = dpid
     self.god_scheduler = god_scheduler
+    # Bound once here rather than looked up for every incoming message
+    self._insert = god_scheduler.insert_pending_message
+    # The controller id doesn't change over the life of the connection, so
+    # compute it lazily on the first message
+    self._cid = None
     # Don't feed messages to the switch directly
     self.on_message_received = self.insert_into_god_scheduler
     self.true_on_message_handler = None
 
   def insert_into_god_scheduler(self, _, ofp_msg):
     ''' Rather than pass directly on to the switch, feed into the god scheduler'''
-    self.god_scheduler.insert_pending_message(self.dpid, self.get_controller_id(), ofp_msg, self)
+    if self._cid is None:
+      self._cid = self.get_controller_id()
+    self._insert(self.dpid, self._cid, ofp_msg, self)
 
   def set_message_handler(self, handler):
     ''' Take the switch's handler, and store it for later use '''
@@ -76,8 +87,9 @@ class FuzzSoftwareSwitch (NXSoftwareSwitch):
 
   @property
   def booted(self):
-    return (self.connection2fsm != {} and
-            set(self.connection2fsm.values()) == set([self.ConnectionFSM.BOOTED]))
+    return (bool(self.connection2fsm) and
+            all(state == self.ConnectionFSM.BOOTED
+                for state in self.connection2fsm.itervalues()))
 
   def add_controller_info(self, info):
     self.controller_info.append(info)
@@ -103,7 +115,7 @@ class FuzzSoftwareSwitch (NXSoftwareSwitch):
         # cause errors to be raised
         conn.error_handler = self.error_handler
         # controller (ip, port) -> connection
-        self.uuid2connection[conn.io_worker.socket.getpeername()] = conn
+        self.uuid2connection[info.uuid] = conn
         connected_to_at_least_one = True
 
     return connected_to_at_least_one
@@ -121,9 +133,11 @@ class FuzzSoftwareSwitch (NXSoftwareSwitch):
       return
     self.failed = True
 
-    for connection in self.connections:
+    # Swap in the empty list first so we don't close connections out from
+    # under anyone iterating over self.connections
+    connections, self.connections = self.connections, []
+    for connection in connections:
       connection.close()
-    self.connections = []
 
   def recover(self, down_controller_ids=None):
     if not self.failed:
@@ -136,15 +150,11 @@ class FuzzSoftwareSwitch (NXSoftwareSwitch):
     return connected_to_at_least_one
 
   def serialize(self):
-    # Skip over non-serializable data, e.g. sockets
-    # TODO(cs): is self.log going to be a problem?
-    serializable = FuzzSoftwareSwitch(self.dpid, self.parent_controller_name)
-    # Can't serialize files
-    serializable.log = None
+    # Skip over non-serializable data, e.g. sockets and loggers
     # TODO(cs): need a cleaner way to add in the NOM port representation
-    if self.software_switch:
-      serializable.ofp_phy_ports = self.software_switch.ports.values()
-    return pickle.dumps(serializable, protocol=0)
+    return pickle.dumps({ 'dpid' : self.dpid, 'name' : self.name,
+                          'ofp_phy_ports' : self.ports.values() },
+                        protocol=2)
 
 class Link (object):
   """
@@ -154,12 +164,15 @@ class Link (object):
 
   Note: Directed!
   """
+  __slots__ = ('start_software_switch', 'start_port', 'end_software_switch',
+               'end_port', '_key', '_hash')
+
   def __init__(self, start_software_switch, start_port, end_software_switch, end_port):
     if type(start_port) == int:
       assert(start_port in start_software_switch.ports)
       start_port = start_software_switch.ports[start_port]
     if type(end_port) == int:
-      assert(end_port in start_software_switch.ports)
+      assert(end_port in end_software_switch.ports)
       end_port = end_software_switch.ports[end_port]
     assert_type("start_port", start_port, ofp_phy_port, none_ok=False)
     assert_type("end_port", end_port, ofp_phy_port, none_ok=False)
@@ -167,18 +180,22 @@ class Link (object):
     self.start_port = start_port
     self.end_software_switch = end_software_switch
     self.end_port = end_port
+    # Links are compared and hashed by their endpoints. dpids and port
+    # numbers are stable across switch objects, unlike id(), and hashing a
+    # tuple doesn't collide for reversed links the way summing hashes does
+    self._key = (start_software_switch.dpid, start_port.port_no,
+                 end_software_switch.dpid, end_port.port_no)
+    self._hash = hash(self._key)
 
   def __eq__(self, other):
-    if not type(other) == Link:
+    if self is other:
+      return True
+    if type(other) is not Link:
       return False
-    return (self.start_software_switch == other.start_software_switch and
-            self.start_port == other.start_port and
-            self.end_software_switch == other.end_software_switch and
-            self.end_port == other.end_port)
+    return self._key == other._key
 
   def __hash__(self):
-    return (self.start_software_switch.__hash__() +  self.start_port.__hash__() +
-           self.end_software_switch.__hash__() +  self.end_port.__hash__())
+    return self._hash
 
   def __repr__(self):
     return "(%d:%d) -> (%d:%d)" % (self.start_software_switch.dpid, self.start_port.port_no,
@@ -193,6 +210,8 @@ class AccessLink (object):
   '''
   Represents a bidirectional edge: host <-> ingress switch
   '''
+  __slots__ = ('host', 'interface', 'switch', 'switch_port')
+
   def __init__(self, host, interface, switch, switch_port):
     assert_type("interface", interface, HostInterface, none_ok=False)
     assert_type("switch_port", switch_port, ofp_phy_port, none_ok=False)
@@ -203,34 +222,40 @@ class AccessLink (object):
 
 class HostInterface (object):
   ''' Represents a host's interface (e.g. eth0) '''
+  __slots__ = ('hw_addr', 'ips', 'name', '_hw_int', '_ip_ints', '_hash')
+
   def __init__(self, hw_addr, ip_or_ips=[], name=""):
     self.hw_addr = hw_addr
     if type(ip_or_ips) != list:
       ip_or_ips = [ip_or_ips]
     self.ips = ip_or_ips
     self.name = name
+    # Integer forms of the addresses, used for __eq__ and __hash__
+    self._hw_int = hw_addr.toInt()
+    self._ip_ints = tuple(sorted(ip.toUnsignedN() for ip in self.ips))
+    # HostInterfaces are used heavily as dict keys, so hash once.
+    # Note: mutating ips or name after construction is not reflected in
+    # __eq__ or __hash__
+    self._hash = hash((self._hw_int, self._ip_ints, self.name))
+
+  def __getstate__(self):
+    # HostInterfaces are pickled into dataplane traces, and slotted classes
+    # can't be pickled with protocol 0 unless they provide their own state
+    return { 'hw_addr' : self.hw_addr, 'ips' : self.ips, 'name' : self.name }
+
+  def __setstate__(self, state):
+    # Also accepts the __dict__ of traces pickled before __slots__ was added
+    self.__init__(state['hw_addr'], state['ips'], state['name'])
 
   def __eq__(self, other):
     if type(other) != HostInterface:
       return False
-    if self.hw_addr.toInt() != other.hw_addr.toInt():
-      return False
-    other_ip_ints = map(lambda ip: ip.toUnsignedN(), other.ips)
-    for ip in self.ips:
-      if ip.toUnsignedN() not in other_ip_ints:
-        return False
-    if len(other.ips) != len(self.ips):
-      return False
-    if self.name != other.name:
-      return False
-    return True
+    return (self._hw_int == other._hw_int and
+            self._ip_ints == other._ip_ints and
+            self.name == other.name)
 
   def __hash__(self):
-    hash_code = self.hw_addr.toInt().__hash__()
-    for ip in self.ips:
-      hash_code += ip.toUnsignedN().__hash__()
-    hash_code += self.name.__hash__()
-    return hash_code
+    return self._hash
 
   def __str__(self, *args, **kwargs):
     return "HostInterface:" + self.name + ":" + str(self.hw_addr) + ":" + str(self.ips)
@@ -284,24 +309,35 @@ class Host (EventMixin):
 class Controller(object):
   '''Encapsulates the state of a running controller.'''
 
-  _active_processes = set() # set of processes that are currently running. These are all killed upon signal reception
+  # set of processes that are currently running. These are all killed upon
+  # signal reception. Weakly referenced, so that processes of Controllers
+  # that have been garbage collected aren't kept alive here
+  _active_processes = weakref.WeakSet()
+  _active_processes_lock = threading.Lock()
+  _ext_dirs_synced = set() # pox ext dirs that the sts sync modules have already been linked into
 
   @staticmethod
   def kill_active_procs():
     '''Kill the active processes. Used by the simulator module to shut down the
     controllers because python can only have a single method to handle SIG* stuff.'''
-    kill_procs(Controller._active_processes)
+    # Note: no locking here, since this runs from a signal handler, which may
+    # have interrupted a thread holding _active_processes_lock
+    kill_procs(list(Controller._active_processes))
 
   def _register_proc(self, proc):
     '''Register a Popen instance that a controller is running in for the cleanup
     that happens when the simulator receives a signal. This method is idempotent.'''
-    self._active_processes.add(proc)
+    with Controller._active_processes_lock:
+      Controller._active_processes.add(proc)
 
   def _unregister_proc(self, proc):
     '''Remove a process from the set of this to be killed when a signal is
     received. This is for use when the Controller process is stopped. This
     method is idempotent.'''
-    self._active_processes.discard(proc)
+    if proc is None:
+      return
+    with Controller._active_processes_lock:
+      Controller._active_processes.discard(proc)
 
   def __del__(self):
     if hasattr(self, 'process') and self.process != None: # if it fails in __init__, process may not have been assigned
@@ -354,16 +390,18 @@ class Controller(object):
       # launch the controller with environment variable 'sts_sync' set
       # to the appropriate listening port. This is quite a hack.
       env = os.environ.copy()
-      port_match = re.search(r':(\d+)$', self.config.sync)
-      if port_match is None:
+      port = self.config.sync_port
+      if port is None:
         raise ValueError("sync: cannot find port in %s" % self.config.sync)
-      port = port_match.group(1)
-      env['sts_sync'] = "ptcp:0.0.0.0:%d" % (int(port),)
+      env['sts_sync'] = "ptcp:0.0.0.0:%d" % (port,)
 
       if self.config.name == "pox":
         src_dir = os.path.join(os.path.dirname(__file__), "..")
         pox_ext_dir = os.path.join(self.config.cwd, "ext")
-        if os.path.exists(pox_ext_dir):
+        if pox_ext_dir in Controller._ext_dirs_synced:
+          # Already linked in by a previous start() of this process
+          pass
+        elif os.path.exists(pox_ext_dir):
           for f in ("sts/util/io_master.py", "sts/syncproto/base.py",
                     "sts/syncproto/pox_syncer.py", "sts/__init__.py"):
             src_path = os.path.join(src_dir, f)
@@ -387,6 +425,7 @@ class Controller(object):
               rel_link = os.path.abspath(src_path)
               self.log.debug("creating symlink %s -> %s", rel_link, dst_path)
               os.symlink(rel_link, dst_path)
+          Controller._ext_dirs_synced.add(pox_ext_dir)
         else:
           self.log.warn("Could not find pox ext dir in %s. Cannot check/link in sync module" % pox_ext_dir)
 
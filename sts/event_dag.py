@@ -13,30 +13,28 @@ def split_list(l, split_ways):
     if split_ways < 1:
       raise ValueError("Split ways must be greater than 0")
 
-    splits = []
-    split_interval = len(l) / split_ways # integer division = floor
-    remainder = len(l) % split_ways # remainder is guaranteed to be less than splitways
-
-    start_idx = 0
-    while len(splits) < split_ways:
-      split_idx = start_idx + split_interval
-      # the first 'remainder' chunks are made one element larger to chew
-      # up the remaining elements (remainder < splitways)
-      # note: len(l) = split_ways *  split_interval + remainder
-      if remainder > 0:
-        split_idx += 1
-        remainder -= 1
-
-      splits.append(l[start_idx:split_idx])
-      start_idx = split_idx
-    return splits
+    # Chunk boundaries are i*n/split_ways (integer division = floor), so
+    # chunk sizes differ by at most one
+    n = len(l)
+    return [ l[i*n/split_ways:(i+1)*n/split_ways]
+             for i in xrange(split_ways) ]
 
 class EventDagView(object):
   def __init__(self, parent, events_list):
     ''' subset is a list '''
     self._parent = parent
     self._events_list = list(events_list)
-    self._events_set = set(self._events_list)
+    self._events_set_cache = None
+    self._input_events = [ e for e in self._events_list
+                           if e._event_flags & INPUT_EVENT_FLAG ]
+
+  @property
+  def _events_set(self):
+    # Views are created for every subset FindMCS tries, and most are only
+    # replayed, so build the membership set on first use
+    if self._events_set_cache is None:
+      self._events_set_cache = set(self._events_list)
+    return self._events_set_cache
 
   @property
   def events(self):
@@ -45,8 +43,7 @@ class EventDagView(object):
 
   @property
   def input_events(self):
-    # TODO(cs): memoize?
-    return [ e for e in self._events_list if isinstance(e, InputEvent) ]
+    return self._input_events
 
   def input_subset(self, subset):
     '''pre: subset must be a subset of only this view'''
@@ -73,29 +70,40 @@ class EventDag(object):
   # TODO(cs): be smarter about this -- peek() too far, and peek()'ing not far
   # enough can both have negative consequences
   _peek_seconds = 0.3
-  # If we prune a failure, make sure that the subsequent
-  # recovery doesn't occur
-  _failure_types = set([SwitchFailure, LinkFailure, ControllerFailure, ControlChannelBlock])
-  # NOTE: we treat failure/recovery as an atomic pair, since it doesn't make
-  # much sense to prune a recovery event
-  _recovery_types = set([SwitchRecovery, LinkRecovery, ControllerRecovery, ControlChannelUnblock])
   # For now, we're ignoring these input types, since their dependencies with
   # other inputs are too complicated to model
   # TODO(cs): model these!
   _ignored_input_types = set([DataplaneDrop, WaitTime, DataplanePermit])
 
   def __init__(self, events, prefix_trie=None):
-    '''events is a list of EventWatcher objects. Refer to log_parser.parse to
+    '''events is a list of Event objects. Refer to superlog_parser.parse to
     see how this is assembled.'''
     # TODO(cs): ugly that the superclass has to keep track of
     # PeekingEventDag's data
     self._prefix_trie = prefix_trie
     self._events_list = events
-    self._events_set = set(self._events_list)
-    self._label2event = {
-     event.label : event
-     for event in self._events_list
-    }
+    # The events list is never mutated, so partition out the inputs once
+    self._input_events = [ e for e in self._events_list
+                           if e._event_flags & INPUT_EVENT_FLAG ]
+    # Only needed for pruning; many DAGs (e.g. peek() and replay prefixes)
+    # are never pruned, so these are built on first use
+    self._events_set_cache = None
+    self._label2event_cache = None
+
+  @property
+  def _events_set(self):
+    if self._events_set_cache is None:
+      self._events_set_cache = set(self._events_list)
+    return self._events_set_cache
+
+  @property
+  def _label2event(self):
+    if self._label2event_cache is None:
+      self._label2event_cache = {
+       event.label : event
+       for event in self._events_list
+      }
+    return self._label2event_cache
 
   @property
   def events(self):
@@ -104,8 +112,7 @@ class EventDag(object):
 
   @property
   def input_events(self):
-    # TODO(cs): memoize?
-    return [ e for e in self._events_list if isinstance(e, InputEvent) ]
+    return self._input_events
 
   def filter_unsupported_input_types(self):
     return EventDagView(self, (e for e in self._events_list
@@ -121,17 +128,23 @@ class EventDag(object):
     # Also note that we treat failure/recovery as an atomic pair, so we don't prune
     # recovery events on their own
     ignored_portion = set(e for e in ignored_portion
-                          if (isinstance(e, InputEvent) and
-                              type(e) not in self._recovery_types))
+                          if (e._event_flags &
+                              (INPUT_EVENT_FLAG | RECOVERY_EVENT_FLAG)) ==
+                             INPUT_EVENT_FLAG)
     remaining = []
+    label2event = self._label2event
     for event in events_list:
       if event not in ignored_portion:
         remaining.append(event)
       else:
-        # Add dependent to ignored_portion
+        # Add dependent to ignored_portion. Dependents always come later in
+        # events_list, so this single pass also prunes transitive dependents.
+        # Skip labels that aren't in this DAG (e.g. it was built from a
+        # truncated trace)
         for label in event.dependent_labels:
-          dependent_event = self._label2event[label]
-          ignored_portion.add(dependent_event)
+          dependent_event = label2event.get(label)
+          if dependent_event is not None:
+            ignored_portion.add(dependent_event)
 
     # Update the migration locations in remaining
     self.update_migrations(remaining, ignored_portion, events_list)
@@ -156,6 +169,9 @@ class EventDag(object):
     # a pruned HostMigration event
     # location is: (ingress dpid, ingress port no)
     currentloc2unprunedloc = {}
+    # label -> index in remaining, built the first time we need to replace a
+    # migration. Replacements keep the label, so it never goes stale
+    label2index = None
 
     for m in [e for e in events_list if type(e) == HostMigration]:
       src = (m.old_ingress_dpid, m.old_ingress_port_no)
@@ -182,8 +198,9 @@ class EventDag(object):
           # Don't mutate m -- instead, replace m
           new_migration = HostMigration(old_dpid, old_port, new_dpid,
                                         new_port, time=m.time, label=m.label)
-          index = remaining.index(m)
-          remaining[index] = new_migration
+          if label2index is None:
+            label2index = { e.label : i for i, e in enumerate(remaining) }
+          remaining[label2index[m.label]] = new_migration
 
   def input_subset(self, subset):
     ''' Return a view of the dag with only the subset dependents
@@ -213,20 +230,19 @@ class EventDag(object):
 
     # NOTE: mutates the elements of self._events_list
     for event in self._events_list:
-      if hasattr(event, 'fingerprint'):
-        # Skip over the class name
-        fingerprint = event.fingerprint[1:]
-        if type(event) in self._failure_types:
-          # Insert it into the previous failure hash
-          fingerprint2previousfailure[fingerprint] = event
-        elif type(event) in self._recovery_types:
-          # Check if there were any failure predecessors
-          if fingerprint in fingerprint2previousfailure:
-            failure = fingerprint2previousfailure[fingerprint]
-            failure.dependent_labels.append(event.label)
-        #elif type(event) in self._ignored_input_types:
-        #  raise RuntimeError("No support for %s dependencies" %
-        #                      type(event).__name__)
+      flags = event._event_flags
+      if not flags & (FAILURE_EVENT_FLAG | RECOVERY_EVENT_FLAG):
+        continue
+      # Skip over the class name
+      fingerprint = event.fingerprint[1:]
+      if flags & FAILURE_EVENT_FLAG:
+        # Insert it into the previous failure hash
+        fingerprint2previousfailure[fingerprint] = event
+      else:
+        # Check if there were any failure predecessors
+        if fingerprint in fingerprint2previousfailure:
+          failure = fingerprint2previousfailure[fingerprint]
+          failure.dependent_labels.add(event.label)
 
   def __len__(self):
     return len(self._events_list)
@@ -28,10 +28,26 @@ class Fingerprint(object):
         flattened[field] = value
     return flattened
 
-  @abc.abstractmethod
+  # Fingerprints are not mutated after construction, and the same fingerprint
+  # is hashed on every proceed() poll while its event is pending, so the hash
+  # is computed once and cached
+  _hash = None
+
   def __hash__(self):
+    if self._hash is None:
+      self._hash = self._compute_hash()
+    return self._hash
+
+  @abc.abstractmethod
+  def _compute_hash(self):
     pass
 
+  def __getstate__(self):
+    # Don't persist the cached hash; recompute it after unpickling
+    state = self.__dict__.copy()
+    state.pop('_hash', None)
+    return state
+
   @abc.abstractmethod
   def __eq__(self, other):
     pass
@@ -128,7 +144,7 @@ class OFFingerprint(Fingerprint):
       field2value[field] = value
     return OFFingerprint(field2value)
 
-  def __hash__(self):
+  def _compute_hash(self):
     hash = 0
     class_name = self._field2value["class"]
     hash += class_name.__hash__()
@@ -173,7 +189,7 @@ class DPFingerprint(Fingerprint):
     else:
       raise ValueError("Unknown dataplane packet type %s" % str(type(ip)))
 
-  def __hash__(self):
+  def _compute_hash(self):
     hash = 0
     if 'class' in self._field2value and len(self._field2value) == 1:
       # This is not an IP packet -- it could be, e.g., an LLDAP packet
@@ -63,7 +63,7 @@ class InputLogger(object):
     '''
     self.last_time = event.time
     json_hash = event.to_json()
-    log.debug("logging event %r" % event)
+    log.debug("logging event %r", event)
     self.output.write(json_hash + '\n')
     if dp_event is not None:
       self.dp_events.append(dp_event)
@@ -86,18 +86,21 @@ def parse(logfile):
   for line in logfile:
     json_hash = json.loads(line.rstrip())
     check_unique_label(json_hash['label'], event_labels)
-    if json_hash['class'] in input_name_to_class:
+    class_name = json_hash['class']
+    # One dict lookup per table rather than a membership test plus index
+    klass = input_name_to_class.get(class_name)
+    if klass is not None:
       sanity_check_external_input_event(event_labels,
                                         dependent_labels,
                                         json_hash)
-      event = input_name_to_class[json_hash['class']].from_json(json_hash)
-    elif json_hash['class'] in internal_event_name_to_class:
+    else:
+      klass = internal_event_name_to_class.get(class_name)
+      if klass is None:
+        log.warn("Unknown class type %s" % class_name)
+        continue
       sanity_check_internal_event(event_labels, dependent_labels,
                                   json_hash)
-      event = internal_event_name_to_class[json_hash['class']].from_json(json_hash)
-    else:
-      log.warn("Unknown class type %s" % json_hash['class'])
-      continue
+    event = klass.from_json(json_hash)
     trace.append(event)
 
   # all the foward dependencies should be satisfied!
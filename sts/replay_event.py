@@ -14,7 +14,6 @@ from sts.util.console import msg
 from sts.entities import Link
 from sts.god_scheduler import PendingReceive, MessageReceipt
 from sts.input_traces.fingerprints import *
-from invariant_checker import InvariantChecker
 import itertools
 import abc
 import logging
@@ -27,8 +26,30 @@ from sts.syncproto.base import SyncTime
 from pox.lib.util import TimeoutError
 log = logging.getLogger("events")
 
+# Bits of Event._event_flags. Lets hot loops classify events with an integer
+# test rather than isinstance() or type set lookups
+INPUT_EVENT_FLAG = 1
+# If EventDag prunes a failure, it makes sure that the subsequent recovery
+# doesn't occur.
+# NOTE: we treat failure/recovery as an atomic pair, since it doesn't make
+# much sense to prune a recovery event
+RECOVERY_EVENT_FLAG = 2
+FAILURE_EVENT_FLAG = 4
+INTERNAL_EVENT_FLAG = 8
+
+# Event class -> the names of the slots that to_json() serializes, computed
+# the first time an instance of that class is serialized
+_class2json_fields = {}
+# Sentinel for slots that were never assigned
+_unset = object()
+
 class Event(object):
   __metaclass__ = abc.ABCMeta
+  __slots__ = ('label', 'time', 'dependent_labels', '_label_id')
+  _event_flags = 0
+  # Public attributes that are computed from the others in __init__, and
+  # so shouldn't be serialized
+  _derived_fields = ()
 
   # Create unique labels for events
   _label_gen = itertools.count(1)
@@ -38,19 +59,24 @@ class Event(object):
   def __init__(self, prefix="e", label=None, time=None, dependent_labels=None):
     if label is None:
       label_id = Event._label_gen.next()
-      label = prefix + str(label_id)
       while label_id in Event._all_label_ids:
         label_id = Event._label_gen.next()
-        label = prefix + str(label_id)
+      label = prefix + str(label_id)
+    else:
+      label_id = int(label[1:])
     if time is None:
       # TODO(cs): compress time for interactive mode?
       time = SyncTime.now()
     self.label = label
-    Event._all_label_ids.add(int(label[1:]))
+    # The integer part of the label. Cheaper to hash than the label itself,
+    # and unique across prefixes since they share _label_gen
+    self._label_id = label_id
+    Event._all_label_ids.add(label_id)
     self.time = time
     # Add on dependent labels to appease log_processing.superlog_parser.
     # TODO(cs): Replayer shouldn't depend on superlog_parser
-    self.dependent_labels = dependent_labels if dependent_labels else []
+    # A set, so that repeated dependencies can't be recorded twice
+    self.dependent_labels = set(dependent_labels) if dependent_labels else set()
 
   @abc.abstractmethod
   def proceed(self, simulation):
@@ -59,8 +85,31 @@ class Event(object):
     later.'''
     pass
 
+  def _public_fields(self):
+    ''' Return a dict of this event's public (non-underscore) attributes '''
+    klass = type(self)
+    names = _class2json_fields.get(klass)
+    if names is None:
+      names = tuple(name
+                    for k in reversed(klass.__mro__)
+                    for name in k.__dict__.get('__slots__', ())
+                    if not (name.startswith('_') or
+                            name in klass._derived_fields))
+      _class2json_fields[klass] = names
+    fields = {}
+    for name in names:
+      value = getattr(self, name, _unset)
+      if value is not _unset:
+        fields[name] = value
+    # Subclasses that don't declare __slots__ (e.g. mocks) still get a __dict__
+    for name, value in getattr(self, '__dict__', {}).iteritems():
+      if not name.startswith('_'):
+        fields[name] = value
+    return fields
+
   def to_json(self):
-    fields = dict(self.__dict__)
+    fields = self._public_fields()
+    fields['dependent_labels'] = sorted(self.dependent_labels)
     fields['class'] = self.__class__.__name__
     if ('fingerprint' in fields and
             isinstance(fields['fingerprint'][1], Fingerprint)):
@@ -70,7 +119,7 @@ class Event(object):
 
   def __hash__(self):
     ''' Assumption: labels are unique '''
-    return self.label.__hash__()
+    return self._label_id
 
   def __eq__(self, other):
     ''' Assumption: labels are unique '''
@@ -95,6 +144,9 @@ class InternalEvent(Event):
   '''An InternalEvent is one that happens within the controller(s) under
   simulation. Derivatives of this class verify that the internal event has
   occured in its proceed method before it returns.'''
+  __slots__ = ()
+  _event_flags = INTERNAL_EVENT_FLAG
+
   def __init__(self, label=None, time=None):
     super(InternalEvent, self).__init__(prefix='i', label=label, time=time)
 
@@ -113,6 +165,9 @@ class InputEvent(Event):
   This class also conceptually models (because it is equivalent to) 'external
   events', which is a term that may be used elsewhere in documentation or
   code.'''
+  __slots__ = ()
+  _event_flags = INPUT_EVENT_FLAG
+
   def __init__(self, label=None, time=None, dependent_labels=None):
     super(InputEvent, self).__init__(prefix='e', label=label, time=time,
                                      dependent_labels=dependent_labels)
@@ -129,15 +184,24 @@ def assert_fields_exist(json_hash, *args):
       raise ValueError("Field %s not in json_hash %s" % (field, str(json_hash)))
 
 def extract_label_time(json_hash):
-  assert_fields_exist(json_hash, 'label', 'time')
-  label = json_hash['label']
-  time = SyncTime(json_hash['time'][0], json_hash['time'][1])
-  return (label, time)
+  # Every event has a label and time, so skip assert_fields_exist's
+  # membership checks and only pay for the error path when one is missing
+  try:
+    label = json_hash['label']
+    time = json_hash['time']
+  except KeyError as e:
+    raise ValueError("Field %s not in json_hash %s" % (e.args[0], str(json_hash)))
+  return (label, SyncTime(time[0], time[1]))
 
 class SwitchFailure(InputEvent):
+  __slots__ = ('dpid', 'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | FAILURE_EVENT_FLAG
+
   def __init__(self, dpid, label=None, time=None):
     super(SwitchFailure, self).__init__(label=label, time=time)
     self.dpid = dpid
+    self.fingerprint = (self.__class__.__name__,self.dpid,)
 
   def proceed(self, simulation):
     software_switch = simulation.topology.get_switch(self.dpid)
@@ -151,14 +215,15 @@ class SwitchFailure(InputEvent):
     dpid = int(json_hash['dpid'])
     return SwitchFailure(dpid, label=label, time=time)
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,self.dpid,)
-
 class SwitchRecovery(InputEvent):
+  __slots__ = ('dpid', 'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | RECOVERY_EVENT_FLAG
+
   def __init__(self, dpid, label=None, time=None):
     super(SwitchRecovery, self).__init__(label=label, time=time)
     self.dpid = dpid
+    self.fingerprint = (self.__class__.__name__,self.dpid,)
 
   def proceed(self, simulation):
     software_switch = simulation.topology.get_switch(self.dpid)
@@ -176,10 +241,6 @@ class SwitchRecovery(InputEvent):
     dpid = int(json_hash['dpid'])
     return SwitchRecovery(dpid, label=label, time=time)
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,self.dpid,)
-
 def get_link(link_event, simulation):
   start_software_switch = simulation.topology.get_switch(link_event.start_dpid)
   end_software_switch = simulation.topology.get_switch(link_event.end_dpid)
@@ -188,6 +249,11 @@ def get_link(link_event, simulation):
   return link
 
 class LinkFailure(InputEvent):
+  __slots__ = ('start_dpid', 'start_port_no', 'end_dpid', 'end_port_no',
+               'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | FAILURE_EVENT_FLAG
+
   def __init__(self, start_dpid, start_port_no, end_dpid, end_port_no,
                label=None, time=None):
     super(LinkFailure, self).__init__(label=label, time=time)
@@ -195,6 +261,9 @@ class LinkFailure(InputEvent):
     self.start_port_no = start_port_no
     self.end_dpid = end_dpid
     self.end_port_no = end_port_no
+    self.fingerprint = (self.__class__.__name__,
+                        self.start_dpid, self.start_port_no,
+                        self.end_dpid, self.end_port_no)
 
   def proceed(self, simulation):
     link = get_link(self, simulation)
@@ -213,13 +282,12 @@ class LinkFailure(InputEvent):
     return LinkFailure(start_dpid, start_port_no, end_dpid, end_port_no,
                        label=label, time=time)
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,
-            self.start_dpid, self.start_port_no,
-            self.end_dpid, self.end_port_no)
-
 class LinkRecovery(InputEvent):
+  __slots__ = ('start_dpid', 'start_port_no', 'end_dpid', 'end_port_no',
+               'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | RECOVERY_EVENT_FLAG
+
   def __init__(self, start_dpid, start_port_no, end_dpid, end_port_no,
                label=None, time=None):
     super(LinkRecovery, self).__init__(label=label, time=time)
@@ -227,6 +295,9 @@ class LinkRecovery(InputEvent):
     self.start_port_no = start_port_no
     self.end_dpid = end_dpid
     self.end_port_no = end_port_no
+    self.fingerprint = (self.__class__.__name__,
+                        self.start_dpid, self.start_port_no,
+                        self.end_dpid, self.end_port_no)
 
   def proceed(self, simulation):
     link = get_link(self, simulation)
@@ -245,16 +316,15 @@ class LinkRecovery(InputEvent):
     return LinkRecovery(start_dpid, start_port_no, end_dpid, end_port_no,
                         label=label, time=time)
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,
-            self.start_dpid, self.start_port_no,
-            self.end_dpid, self.end_port_no)
-
 class ControllerFailure(InputEvent):
+  __slots__ = ('controller_id', 'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | FAILURE_EVENT_FLAG
+
   def __init__(self, controller_id, label=None, time=None):
     super(ControllerFailure, self).__init__(label=label, time=time)
     self.controller_id = controller_id
+    self.fingerprint = (self.__class__.__name__,self.controller_id)
 
   def proceed(self, simulation):
     controller = simulation.controller_manager.get_controller(self.controller_id)
@@ -264,19 +334,20 @@ class ControllerFailure(InputEvent):
   @staticmethod
   def from_json(json_hash):
     (label, time) = extract_label_time(json_hash)
-    assert_fields_exist('controller_id')
+    assert_fields_exist(json_hash, 'controller_id')
     controller_id = json_hash['controller_id']
     controller_id = (controller_id[0], int(controller_id[1]))
     return ControllerFailure(controller_id, label=label, time=time)
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,self.controller_id)
-
 class ControllerRecovery(InputEvent):
+  __slots__ = ('controller_id', 'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | RECOVERY_EVENT_FLAG
+
   def __init__(self, controller_id, label=None, time=None):
     super(ControllerRecovery, self).__init__(label=label, time=time)
     self.controller_id = controller_id
+    self.fingerprint = (self.__class__.__name__,self.controller_id)
 
   def proceed(self, simulation):
     controller = simulation.controller_manager.get_controller(self.controller_id)
@@ -286,16 +357,16 @@ class ControllerRecovery(InputEvent):
   @staticmethod
   def from_json(json_hash):
     (label, time) = extract_label_time(json_hash)
-    assert_fields_exist('controller_id')
+    assert_fields_exist(json_hash, 'controller_id')
     controller_id = json_hash['controller_id']
     controller_id = (controller_id[0], int(controller_id[1]))
-    return ControllerFailure(controller_id, label=label, time=time)
-
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,self.controller_id)
+    return ControllerRecovery(controller_id, label=label, time=time)
 
 class HostMigration(InputEvent):
+  __slots__ = ('old_ingress_dpid', 'old_ingress_port_no',
+               'new_ingress_dpid', 'new_ingress_port_no', 'fingerprint')
+  _derived_fields = ('fingerprint',)
+
   def __init__(self, old_ingress_dpid, old_ingress_port_no,
                new_ingress_dpid, new_ingress_port_no, label=None, time=None):
     super(HostMigration, self).__init__(label=label, time=time)
@@ -303,6 +374,9 @@ class HostMigration(InputEvent):
     self.old_ingress_port_no = old_ingress_port_no
     self.new_ingress_dpid = new_ingress_dpid
     self.new_ingress_port_no =  new_ingress_port_no
+    self.fingerprint = (self.__class__.__name__,self.old_ingress_dpid,
+                        self.old_ingress_port_no, self.new_ingress_dpid,
+                        self.new_ingress_port_no)
 
   def proceed(self, simulation):
     simulation.topology.migrate_host(self.old_ingress_dpid,
@@ -324,13 +398,9 @@ class HostMigration(InputEvent):
                          new_ingress_dpid, new_ingress_port_no,
                          label=label, time=time)
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,self.old_ingress_dpid,
-            self.old_ingress_port_no, self.new_ingress_dpid,
-            self.new_ingress_port_no)
-
 class PolicyChange(InputEvent):
+  __slots__ = ('request_type',)
+
   def __init__(self, request_type, label=None, time=None):
     super(PolicyChange, self).__init__(label=label, time=time)
     self.request_type = request_type
@@ -347,6 +417,8 @@ class PolicyChange(InputEvent):
     return PolicyChange(request_type, label=label, time=time)
 
 class TrafficInjection(InputEvent):
+  __slots__ = ()
+
   def __init__(self, label=None, time=None):
     super(TrafficInjection, self).__init__(label=label, time=time)
 
@@ -362,13 +434,15 @@ class TrafficInjection(InputEvent):
     return TrafficInjection(label, time)
 
 class WaitTime(InputEvent):
+  __slots__ = ('wait_time',)
+
   def __init__(self, wait_time, label=None, time=None):
     ''' wait_time is specified in seconds '''
     super(WaitTime, self).__init__(label=label, time=time)
     self.wait_time = wait_time
 
   def proceed(self, simulation):
-    log.info("WaitTime: pausing simulation for %f seconds" % (self.wait_time))
+    log.info("WaitTime: pausing simulation for %f seconds", self.wait_time)
     time.sleep(self.wait_time)
     return True
 
@@ -380,10 +454,18 @@ class WaitTime(InputEvent):
     return WaitTime(wait_time, label=label, time=time)
 
 class CheckInvariants(InputEvent):
+  __slots__ = ('fail_on_error', 'invariant_check')
+
   def __init__(self, fail_on_error=False, label=None, time=None,
-               invariant_check=InvariantChecker.check_correspondence):
+               invariant_check=None):
+    ''' invariant_check defaults to InvariantChecker.check_correspondence '''
     super(CheckInvariants, self).__init__(label=label, time=time)
     self.fail_on_error = fail_on_error
+    if invariant_check is None:
+      # Resolved here rather than in the signature, since this module no
+      # longer imports InvariantChecker at load time
+      from sts.invariant_checker import InvariantChecker
+      invariant_check = InvariantChecker.check_correspondence
     self.invariant_check = invariant_check
 
   def proceed(self, simulation):
@@ -393,13 +475,14 @@ class CheckInvariants(InputEvent):
     if violations != []:
       log.warning("Correctness violations!: %s" % str(violations))
       if self.fail_on_error:
-        exit(5)
+        raise RuntimeError("Correctness violations: %s" % str(violations))
     else:
       log.info("No correctness violations!")
     return True
 
   def to_json(self):
-    fields = dict(self.__dict__)
+    fields = self._public_fields()
+    fields['dependent_labels'] = sorted(self.dependent_labels)
     fields['invariant_check'] = marshal.dumps(self.invariant_check.func_code)\
                                        .encode('base64')
     fields['invariant_name'] = self.invariant_check.__name__
@@ -412,20 +495,29 @@ class CheckInvariants(InputEvent):
     fail_on_error = False
     if 'fail_on_error' in json_hash:
       fail_on_error = json_hash['fail_on_error']
-    invariant_check = InvariantChecker.check_correspondence
+    invariant_check = None
     if 'invariant_check' in json_hash:
-      # Assumes that the closure is empty
+      # Assumes that the closure is empty. The code was compiled in
+      # sts.invariant_checker, so resolve its globals there
+      import sts.invariant_checker
       code = marshal.loads(json_hash['invariant_check'].decode('base64'))
-      invariant_check = types.FunctionType(code, globals())
+      invariant_check = types.FunctionType(code,
+                                           sts.invariant_checker.__dict__)
     return CheckInvariants(label=label, time=time,
                            fail_on_error=fail_on_error,
                            invariant_check=invariant_check)
 
 class ControlChannelBlock(InputEvent):
+  __slots__ = ('dpid', 'controller_id', 'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | FAILURE_EVENT_FLAG
+
   def __init__(self, dpid, controller_id, label=None, time=None):
     super(ControlChannelBlock, self).__init__(label=label, time=time)
     self.dpid = dpid
     self.controller_id = controller_id
+    self.fingerprint = (self.__class__.__name__,
+                        self.dpid, self.controller_id)
 
   def proceed(self, simulation):
     switch = simulation.topology.get_switch(self.dpid)
@@ -435,11 +527,6 @@ class ControlChannelBlock(InputEvent):
     connection.block()
     return True
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,
-            self.dpid, self.controller_id)
-
   @staticmethod
   def from_json(json_hash):
     (label, time) = extract_label_time(json_hash)
@@ -449,10 +536,16 @@ class ControlChannelBlock(InputEvent):
     return ControlChannelBlock(dpid, controller_id, label=label, time=time)
 
 class ControlChannelUnblock(InputEvent):
+  __slots__ = ('dpid', 'controller_id', 'fingerprint')
+  _derived_fields = ('fingerprint',)
+  _event_flags = INPUT_EVENT_FLAG | RECOVERY_EVENT_FLAG
+
   def __init__(self, dpid, controller_id, label=None, time=None):
     super(ControlChannelUnblock, self).__init__(label=label, time=time)
     self.dpid = dpid
     self.controller_id = controller_id
+    self.fingerprint = (self.__class__.__name__,
+                        self.dpid, self.controller_id)
 
   def proceed(self, simulation):
     switch = simulation.topology.get_switch(self.dpid)
@@ -462,11 +555,6 @@ class ControlChannelUnblock(InputEvent):
     connection.unblock()
     return True
 
-  @property
-  def fingerprint(self):
-    return (self.__class__.__name__,
-            self.dpid, self.controller_id)
-
   @staticmethod
   def from_json(json_hash):
     (label, time) = extract_label_time(json_hash)
@@ -479,6 +567,8 @@ class ControlChannelUnblock(InputEvent):
 # with other input events!
 # For now, turn them off completely.
 class DataplaneDrop(InputEvent):
+  __slots__ = ('fingerprint',)
+
   def __init__(self, fingerprint, label=None, time=None):
     super(DataplaneDrop, self).__init__(label=label, time=time)
     if type(fingerprint) == list:
@@ -502,6 +592,8 @@ class DataplaneDrop(InputEvent):
     return DataplaneDrop(fingerprint, label=label, time=time)
 
 class DataplanePermit(InputEvent):
+  __slots__ = ('fingerprint',)
+
   def __init__(self, fingerprint, label=None, time=None):
     super(DataplanePermit, self).__init__(label=label, time=time)
     if type(fingerprint) == list:
@@ -541,6 +633,8 @@ class ControlMessageReceive(InternalEvent):
   Logged whenever the GodScheduler decides to allow a switch to see an
   openflow packet.
   '''
+  __slots__ = ('dpid', 'controller_id', 'fingerprint')
+
   def __init__(self, dpid, controller_id, fingerprint, label=None, time=None):
     super(ControlMessageReceive, self).__init__(label=label, time=time)
     self.dpid = dpid
@@ -580,6 +674,8 @@ class ControllerStateChange(InternalEvent):
   Logged for any relevent kind of state change in the controller (e.g.
   mastership change)
   '''
+  __slots__ = ('controller_id', 'fingerprint', 'name', 'value')
+
   def __init__(self, controller_id, fingerprint, name, value, label=None, time=None):
     super(ControllerStateChange, self).__init__(label=label, time=time)
     self.controller_id = controller_id
@@ -616,7 +712,7 @@ class DeterministicValue(InternalEvent):
   Logged whenever the controller asks for a deterministic value (e.g.
   gettimeofday()
   '''
-  pass
+  __slots__ = ()
 
 all_internal_events = [ControlMessageReceive,
                        ControllerStateChange, DeterministicValue]
@@ -625,6 +721,8 @@ all_internal_events = [ControlMessageReceive,
 
 class InvariantViolation(Event):
   ''' Class for logging violations as json dicts '''
+  __slots__ = ('violations',)
+
   def __init__(self, violations):
     Event.__init__(self)
     self.violations = [ str(v) for v in violations ]
@@ -348,10 +348,10 @@ class Topology(object):
     return self.dpid2switch.values()
 
   def get_switch(self, dpid):
-    dpid = dpid
-    if dpid not in self.dpid2switch:
+    try:
+      return self.dpid2switch[dpid]
+    except KeyError:
       raise RuntimeError("unknown dpid %d" % dpid)
-    return self.dpid2switch[dpid]
 
   @property
   def live_switches(self):
@@ -11,7 +11,8 @@ import tempfile
 sys.path.append(os.path.dirname(__file__) + "/../../..")
 
 import sts.log_processing.superlog_parser as superlog_parser
-from sts.replay_event import LinkFailure, LinkRecovery
+from sts.replay_event import LinkFailure, LinkRecovery, ControllerFailure, \
+                             ControllerRecovery
 
 class superlog_parser_test(unittest.TestCase):
   tmpfile = '/tmp/superlog.tmp'
@@ -27,6 +28,17 @@ class superlog_parser_test(unittest.TestCase):
     superlog.write(e2 + '\n')
     superlog.close()
 
+  def open_controller_superlog(self):
+    ''' Returns the file. Make sure to close afterwards! '''
+    superlog = open(self.tmpfile, 'w')
+    e1 = str('''{"dependent_labels": ["e2"], "controller_id": ["127.0.0.1", 6633],'''
+             ''' "class": "ControllerFailure", "label": "e1", "time": [0,0]}''')
+    superlog.write(e1 + '\n')
+    e2 = str('''{"dependent_labels": [], "controller_id": ["127.0.0.1", 6633],'''
+             ''' "class": "ControllerRecovery", "label": "e2", "time": [0,0]}''')
+    superlog.write(e2 + '\n')
+    superlog.close()
+
   def test_basic(self):
     name = None
     try:
@@ -39,5 +51,13 @@ class superlog_parser_test(unittest.TestCase):
       if name is not None:
         os.unlink(name)
 
+  def test_controller_events(self):
+    self.open_controller_superlog()
+    events = superlog_parser.parse_path(self.tmpfile)
+    self.assertEqual(2, len(events))
+    self.assertEqual(ControllerFailure,type(events[0]))
+    self.assertEqual(ControllerRecovery,type(events[1]))
+    self.assertEqual(("127.0.0.1", 6633), events[1].controller_id)
+
 if __name__ == '__main__':
   unittest.main()
@@ -103,6 +103,20 @@ class event_dag_test(unittest.TestCase):
     sub_graph = event_dag.input_complement([mockInputEvent])
     self.assertEqual( [ e for (i, e) in enumerate(event_dag.events) if i==0 or i==2 ], sub_graph.events)
 
+  def test_event_dag_complement_dependents(self):
+    first = MockInputEvent(label='e1')
+    second = MockInputEvent(label='e2')
+    third = MockInputEvent(label='e3')
+    first.dependent_labels.add('e2')
+    second.dependent_labels.add('e3')
+    # The dependent of the dependent is pruned too; labels not in the DAG are
+    # ignored
+    third.dependent_labels.add('e4')
+    event_dag = EventDag([ first, second, third ])
+    self.assertEqual([], event_dag.input_complement([first]).events)
+    self.assertEqual([first], event_dag.input_complement([second]).events)
+    self.assertEqual([first, second], event_dag.input_complement([third]).events)
+
   def test_migration_simple(self):
     events = [ MockInternalEvent('a'), HostMigration(1,1,2,2),
                MockInternalEvent('b'), HostMigration(2,2,3,3),